@@ -1,20 +1,75 @@
-import subprocess
+import contextlib
+import math
+import re
+import signal
 import tempfile
-from typing import Optional
+import threading
+import time
+from typing import List, Optional
 
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, RedirectResponse
 
+from src.core import config, shared_state
+from src.core.resilience import (
+    DEADLINE_HEADER,
+    CircuitOpenError,
+    DeadlineExceededError,
+    reset_request_deadline,
+    run_registry_command,
+    set_request_deadline,
+)
+from src.core.urls import extract_registry_host
 from src.helm.helm import (
     build_chart_reference,
-    extract_registry_host,
     helm_registry_login,
+    pushed_chart_reference,
 )
 from src.skopeo.skopeo import SkopeoClient
 
 from . import schemas
 
+
+def _watch_shutdown_signals(shutdown_started: List[float]) -> None:
+    """
+    Record when the server is asked to stop, so the job drain below shares
+    one budget with uvicorn's own wait for in-flight requests. Wraps the
+    handlers uvicorn installed; they are restored by uvicorn on exit.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+
+        def handler(signum, frame, previous=previous):
+            if not shutdown_started:
+                shutdown_started.append(time.monotonic())
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(sig, handler)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # A worker replacing one that died picks up the jobs it left behind.
+    await run_in_threadpool(shared_state.interrupt_orphaned_jobs)
+    shutdown_started: List[float] = []
+    _watch_shutdown_signals(shutdown_started)
+    yield
+    # uvicorn has already spent part of the budget waiting for requests;
+    # handlers still running in the threadpool get what is left.
+    started = shutdown_started[0] if shutdown_started else time.monotonic()
+    remaining = config.GRACEFUL_SHUTDOWN_TIMEOUT - (time.monotonic() - started)
+    drained = await run_in_threadpool(shared_state.wait_for_jobs, max(remaining, 0))
+    if not drained:
+        shared_state.interrupt_jobs()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Artefact Manager API",
     description="WIP API for managing artefacts using Skopeo.",
     version="0.1.0",
@@ -27,6 +82,34 @@ app = FastAPI(
 )
 
 
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    """
+    Bound every registry call made while serving the request by the
+    client-supplied deadline header, if present.
+    """
+    header = request.headers.get(DEADLINE_HEADER)
+    timeout = None
+    if header is not None:
+        try:
+            timeout = float(header)
+        except ValueError:
+            timeout = -1.0
+        if not math.isfinite(timeout) or timeout <= 0:
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "detail": f"{DEADLINE_HEADER} must be a finite positive number of seconds."
+                },
+            )
+
+    token = set_request_deadline(timeout)
+    try:
+        return await call_next(request)
+    finally:
+        reset_request_deadline(token)
+
+
 @app.get("/", include_in_schema=False)
 def redirect_to_docs():
     return RedirectResponse(url="/docs")
@@ -50,6 +133,10 @@ def artefact_exists(
         )
         return schemas.PostArtefactExistsResponse(exists=exists)
 
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except PermissionError as e:
@@ -70,23 +157,72 @@ def copy_artefact(
         dst_name = artefact.dst_artefact_name or artefact.src_artefact_name
         dst_tag = artefact.dst_artefact_tag or artefact.src_artefact_tag
 
-        success = SkopeoClient.copy_artefact(
-            src_registry_url=artefact.src_registry_url,
-            src_artefact_name=artefact.src_artefact_name,
-            src_artefact_tag=artefact.src_artefact_tag,
-            dst_registry_url=artefact.dst_registry_url,
-            dst_artefact_name=dst_name,
-            dst_artefact_tag=dst_tag,
-            src_registry_username=artefact.src_registry_username,
-            src_registry_password=artefact.src_registry_password,
-            dst_registry_username=artefact.dst_registry_username,
-            dst_registry_password=artefact.dst_registry_password,
+        description = (
+            f"{artefact.src_registry_url.rstrip('/')}/{artefact.src_artefact_name}:"
+            f"{artefact.src_artefact_tag} -> "
+            f"{artefact.dst_registry_url.rstrip('/')}/{dst_name}:{dst_tag}"
         )
+        with shared_state.track_job("copy", description):
+            success = SkopeoClient.copy_artefact(
+                src_registry_url=artefact.src_registry_url,
+                src_artefact_name=artefact.src_artefact_name,
+                src_artefact_tag=artefact.src_artefact_tag,
+                dst_registry_url=artefact.dst_registry_url,
+                dst_artefact_name=dst_name,
+                dst_artefact_tag=dst_tag,
+                src_registry_username=artefact.src_registry_username,
+                src_registry_password=artefact.src_registry_password,
+                dst_registry_username=artefact.dst_registry_username,
+                dst_registry_password=artefact.dst_registry_password,
+            )
         return schemas.PostCopyArtefactResponse(success=success)
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _push_chart(
+    content: bytes,
+    filename: str,
+    registry_url: str,
+    registry_username: Optional[str],
+    registry_password: Optional[str],
+) -> None:
+    """
+    Push a packaged Helm chart to an OCI registry, logging in first if
+    credentials are given.
+
+    Raises:
+        RuntimeError: If login or push fails
+    """
+    with tempfile.NamedTemporaryFile(delete=True, suffix=".tgz") as temp_chart:
+        temp_chart.write(content)
+        temp_chart.flush()
+
+        if registry_username and registry_password:
+            registry_host = extract_registry_host(registry_url)
+            helm_registry_login(registry_host, registry_username, registry_password)
+
+        helm_command = ["helm", "push", temp_chart.name, registry_url]
+        with shared_state.track_job("push", f"{filename} -> {registry_url}"):
+            result = run_registry_command(helm_command, "push", [registry_url])
+            if result.returncode != 0:
+                error_message = result.stderr.strip()
+                if "unauthorized" in error_message.lower() or re.search(
+                    r"status(?: code)?:? 401\b", error_message
+                ):
+                    # Helm's stored login is stale; log in again next time.
+                    shared_state.forget_login(extract_registry_host(registry_url))
+                raise RuntimeError(f"Helm push failed: {error_message}")
+
+        reference = pushed_chart_reference(result.stdout + result.stderr)
+        if reference:
+            shared_state.invalidate_artefact(reference)
+
+
 @app.post("/artefact", tags=["Artefact Management"])
 async def upload_artefact(
     artefact_file: UploadFile = File(
@@ -130,27 +266,23 @@ async def upload_artefact(
         )
 
     try:
-        with tempfile.NamedTemporaryFile(delete=True, suffix=".tgz") as temp_chart:
-            content = await artefact_file.read()
-            temp_chart.write(content)
-            temp_chart.flush()
-
-            if registry_username and registry_password:
-                registry_host = extract_registry_host(registry_url)
-                helm_registry_login(registry_host, registry_username, registry_password)
-
-            helm_command = ["helm", "push", temp_chart.name, registry_url]
-            result = subprocess.run(
-                helm_command,
-                capture_output=True,
-                text=True,
-            )
-            if result.returncode != 0:
-                raise RuntimeError(f"Helm push failed: {result.stderr.strip()}")
-
+        content = await artefact_file.read()
+        # Login, push and job tracking block, keep them off the event loop.
+        await run_in_threadpool(
+            _push_chart,
+            content,
+            artefact_file.filename,
+            registry_url,
+            registry_username,
+            registry_password,
+        )
         return schemas.PostUploadArtefactResponse(
             success=True, detail="Artefact uploaded successfully."
         )
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
@@ -162,7 +294,7 @@ async def upload_artefact(
 
 
 @app.delete("/artefact", tags=["Artefact Management"])
-async def delete_artefact(
+def delete_artefact(
     artefact: schemas.PostDeleteArtefact,
 ) -> schemas.PostDeleteArtefactResponse:
     """
@@ -201,33 +333,53 @@ async def delete_artefact(
                 ]
             )
 
-        result = subprocess.run(
-            delete_cmd,
-            capture_output=True,
-            text=True,
-        )
-        if result.returncode != 0:
-            error_message = result.stderr.strip()
-            if (
-                "unauthorized" in error_message.lower()
-                or "invalid username/password" in error_message.lower()
-            ):
-                raise RuntimeError(f"Authentication failed: {error_message}")
-            elif "not found" in error_message.lower():
-                raise RuntimeError(
-                    f"Artefact {artefact.artefact_name}:{artefact.artefact_version} not found in registry"
-                )
-            else:
-                raise RuntimeError(f"Artefact deletion failed: {error_message}")
+        with shared_state.track_job("delete", artefact_ref):
+            result = run_registry_command(delete_cmd, "delete", [artefact.registry_url])
+            if result.returncode != 0:
+                error_message = result.stderr.strip()
+                if (
+                    "unauthorized" in error_message.lower()
+                    or "invalid username/password" in error_message.lower()
+                ):
+                    raise RuntimeError(f"Authentication failed: {error_message}")
+                elif "not found" in error_message.lower():
+                    raise RuntimeError(
+                        f"Artefact {artefact.artefact_name}:{artefact.artefact_version} not found in registry"
+                    )
+                else:
+                    raise RuntimeError(f"Artefact deletion failed: {error_message}")
 
+        shared_state.invalidate_artefact(artefact_ref)
         return schemas.PostDeleteArtefactResponse(
             success=True,
             detail=f"Artefact {artefact.artefact_name}:{artefact.artefact_version} deleted successfully.",
         )
 
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"An unexpected error occurred: {e}"
         )
+
+
+@app.get("/jobs", tags=["Artefact Management"])
+def list_jobs(
+    status: Optional[schemas.JobStatus] = Query(
+        None,
+        description="Only list jobs in this status, e.g. running. Omit for all jobs.",
+    ),
+) -> schemas.GetJobsResponse:
+    """
+    API endpoint to list the copy, push and delete operations tracked by
+    every worker of this server.
+    """
+    try:
+        jobs = shared_state.list_jobs(status=status.value if status else None)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return schemas.GetJobsResponse(jobs=[schemas.Job(**job) for job in jobs])
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -8,6 +8,13 @@ class ArtefactType(str, Enum):
     HELM = "HELM"
 
 
+class JobStatus(str, Enum):
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    INTERRUPTED = "interrupted"
+
+
 class PostArtefactExists(BaseModel):
     registry_url: str = Field(
         ...,
@@ -187,3 +194,18 @@ class PostDeleteArtefact(BaseModel):
 class PostDeleteArtefactResponse(BaseModel):
     success: bool
     detail: str
+
+
+class Job(BaseModel):
+    id: str
+    operation: str
+    description: str
+    status: JobStatus
+    pid: int
+    started_at: float
+    finished_at: Optional[float] = None
+    detail: Optional[str] = None
+
+
+class GetJobsResponse(BaseModel):
+    jobs: List[Job]
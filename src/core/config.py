@@ -0,0 +1,99 @@
+"""
+Runtime configuration read from environment variables.
+"""
+
+import os
+import tempfile
+
+
+def _env_float(name: str, default: float) -> float:
+    """
+    Read a float from the environment, falling back to a default.
+
+    Args:
+        name: Environment variable name
+        default: Value used when the variable is unset or empty
+
+    Returns:
+        The parsed value
+
+    Raises:
+        ValueError: If the variable is set but is not a valid number
+    """
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Environment variable {name} must be a number, got {value!r}")
+
+
+def _env_int(name: str, default: int) -> int:
+    """
+    Read an integer from the environment, falling back to a default.
+
+    Args:
+        name: Environment variable name
+        default: Value used when the variable is unset or empty
+
+    Returns:
+        The parsed value
+
+    Raises:
+        ValueError: If the variable is set but is not a valid integer
+    """
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(
+            f"Environment variable {name} must be an integer, got {value!r}"
+        )
+
+
+# Upper bound, in seconds, for each kind of registry call. A client-supplied
+# deadline can only shorten these, never extend them.
+OPERATION_TIMEOUTS = {
+    "inspect": _env_float("ARTEFACT_MANAGER_INSPECT_TIMEOUT", 30.0),
+    "copy": _env_float("ARTEFACT_MANAGER_COPY_TIMEOUT", 900.0),
+    "login": _env_float("ARTEFACT_MANAGER_LOGIN_TIMEOUT", 30.0),
+    "push": _env_float("ARTEFACT_MANAGER_PUSH_TIMEOUT", 300.0),
+    "delete": _env_float("ARTEFACT_MANAGER_DELETE_TIMEOUT", 60.0),
+}
+
+# Consecutive connection failures before a registry's circuit opens.
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = _env_int(
+    "ARTEFACT_MANAGER_CIRCUIT_FAILURE_THRESHOLD", 5
+)
+
+# Seconds an open circuit waits before letting a half-open probe through.
+CIRCUIT_BREAKER_RESET_TIMEOUT = _env_float(
+    "ARTEFACT_MANAGER_CIRCUIT_RESET_TIMEOUT", 30.0
+)
+
+# Production server settings, see src/main.py.
+HOST = os.environ.get("ARTEFACT_MANAGER_HOST", "0.0.0.0")
+PORT = _env_int("ARTEFACT_MANAGER_PORT", 8000)
+WORKERS = _env_int("ARTEFACT_MANAGER_WORKERS", os.cpu_count() or 1)
+BACKLOG = _env_int("ARTEFACT_MANAGER_BACKLOG", 2048)
+KEEP_ALIVE_TIMEOUT = _env_int("ARTEFACT_MANAGER_KEEP_ALIVE_TIMEOUT", 30)
+# Total seconds a stopping worker waits for in-flight requests and the copies,
+# pushes and deletes they run. Raise it above ARTEFACT_MANAGER_COPY_TIMEOUT
+# for long copies to be drained, along with the orchestrator's grace period.
+GRACEFUL_SHUTDOWN_TIMEOUT = _env_int("ARTEFACT_MANAGER_GRACEFUL_SHUTDOWN_TIMEOUT", 120)
+
+# SQLite database (WAL mode) holding the state shared between workers.
+STATE_DB_PATH = os.environ.get(
+    "ARTEFACT_MANAGER_STATE_DB",
+    os.path.join(tempfile.gettempdir(), "artefact-manager-state.db"),
+)
+
+# How long, in seconds, shared lookups stay valid. 0 disables the cache.
+EXISTS_CACHE_TTL = _env_float("ARTEFACT_MANAGER_EXISTS_CACHE_TTL", 30.0)
+LOGIN_CACHE_TTL = _env_float("ARTEFACT_MANAGER_LOGIN_CACHE_TTL", 300.0)
+
+# Seconds finished jobs are kept in the shared job table.
+JOB_RETENTION = _env_float("ARTEFACT_MANAGER_JOB_RETENTION", 3600.0)
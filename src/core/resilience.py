@@ -0,0 +1,255 @@
+"""
+Deadlines, per-operation timeouts and per-registry circuit breakers for the
+CLI calls made against artefact registries.
+"""
+
+import contextvars
+import subprocess
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+from src.core import config, shared_state
+from src.core.urls import extract_registry_host
+
+# Header a client can send to bound the whole request, in seconds.
+DEADLINE_HEADER = "X-Request-Timeout"
+
+_request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+# stderr fragments that mean the registry could not be reached, as opposed to
+# the registry answering with an error (auth, not found, ...).
+_CONNECTION_ERROR_MARKERS = (
+    "connection refused",
+    "connection reset",
+    "no route to host",
+    "network is unreachable",
+    "no such host",
+    "name or service not known",
+    "i/o timeout",
+    "tls handshake timeout",
+    "context deadline exceeded",
+)
+
+
+class DeadlineExceededError(RuntimeError):
+    """
+    Raised when a registry call runs past its timeout or the request deadline.
+    """
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised when a registry call is rejected because the circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for a single registry host.
+
+    The circuit opens after ``failure_threshold`` consecutive connection
+    failures. Once ``reset_timeout`` seconds have passed, a single probe call
+    is let through (half-open); its outcome either closes the circuit or
+    opens it again. The state lives in the shared store, so failures seen by
+    any worker count towards the threshold and only one worker probes.
+    """
+
+    CLOSED = shared_state.BREAKER_CLOSED
+    OPEN = shared_state.BREAKER_OPEN
+    HALF_OPEN = shared_state.BREAKER_HALF_OPEN
+
+    def __init__(
+        self, registry_host: str, failure_threshold: int, reset_timeout: float
+    ):
+        self.registry_host = registry_host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        # Id of the probe claimed by the current thread's call, if any.
+        self._claims = threading.local()
+
+    @property
+    def state(self) -> str:
+        return shared_state.breaker_state(self.registry_host)
+
+    def allow_request(self, probe_timeout: float = 60.0) -> bool:
+        """
+        Check whether a call may go through, claiming the half-open probe
+        slot if the reset timeout has elapsed.
+
+        :param probe_timeout: Seconds after which an unreleased probe claim
+                              lapses, e.g. because its worker died.
+        :return: True if the call may proceed, False to fail fast.
+        """
+        probe_id = uuid.uuid4().hex
+        allowed = shared_state.breaker_allow_request(
+            self.registry_host, self.reset_timeout, probe_timeout, probe_id
+        )
+        if allowed:
+            self._claims.probe_id = probe_id
+        return allowed
+
+    def release_probe(self) -> None:
+        """
+        Give back a half-open probe slot claimed by a call that never ran.
+        """
+        probe_id = getattr(self._claims, "probe_id", None)
+        if probe_id is not None:
+            shared_state.breaker_release_probe(self.registry_host, probe_id)
+
+    def record_success(self) -> None:
+        shared_state.breaker_record_success(self.registry_host)
+
+    def record_failure(self) -> None:
+        shared_state.breaker_record_failure(self.registry_host, self.failure_threshold)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(registry_host: str) -> CircuitBreaker:
+    """
+    Return the circuit breaker for a registry host, creating it on first use.
+
+    :param registry_host: The registry hostname (e.g., registry.example.com)
+    :return: The breaker shared by every call to that host.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(registry_host)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                registry_host,
+                failure_threshold=config.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=config.CIRCUIT_BREAKER_RESET_TIMEOUT,
+            )
+            _breakers[registry_host] = breaker
+        return breaker
+
+
+def set_request_deadline(timeout: Optional[float]) -> contextvars.Token:
+    """
+    Set the deadline for the current request, ``timeout`` seconds from now.
+
+    :param timeout: Seconds the client is willing to wait, or None for no
+                    request-wide deadline.
+    :return: Token to pass to ``reset_request_deadline``.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    return _request_deadline.set(deadline)
+
+
+def reset_request_deadline(token: contextvars.Token) -> None:
+    _request_deadline.reset(token)
+
+
+def _effective_timeout(operation: str) -> float:
+    """
+    Combine the configured timeout for ``operation`` with the time left
+    before the request deadline.
+
+    :raises DeadlineExceededError: If the request deadline has already passed.
+    """
+    timeout = config.OPERATION_TIMEOUTS[operation]
+    deadline = _request_deadline.get()
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError(
+                f"Request deadline exceeded before {operation} could start."
+            )
+        timeout = min(timeout, remaining)
+    return timeout
+
+
+def is_connection_error(error_message: str) -> bool:
+    """
+    Tell whether CLI error output means the registry could not be reached.
+    """
+    error_message = error_message.lower()
+    return any(marker in error_message for marker in _CONNECTION_ERROR_MARKERS)
+
+
+def _failed_hosts(hosts: List[str], error_message: str) -> List[str]:
+    # Blame the hosts named in the error if any; otherwise every host involved.
+    mentioned = [host for host in hosts if host in error_message.lower()]
+    return mentioned or hosts
+
+
+def run_registry_command(
+    command: Sequence[str],
+    operation: str,
+    registry_urls: Sequence[str],
+    check: bool = False,
+) -> subprocess.CompletedProcess:
+    """
+    Run a registry CLI command bounded by the operation timeout, the request
+    deadline and the circuit breakers of the registries it talks to.
+
+    :param command: The command line to execute
+    :param operation: Key into ``config.OPERATION_TIMEOUTS``
+    :param registry_urls: URLs or hosts of the registries the command reaches
+    :param check: Raise CalledProcessError on a non-zero exit, as
+                  ``subprocess.run`` does.
+    :return: The completed process, with text stdout/stderr captured.
+    :raises CircuitOpenError: If a registry's circuit is open.
+    :raises DeadlineExceededError: If the command does not finish in time.
+    """
+    hosts = list(dict.fromkeys(extract_registry_host(url) for url in registry_urls))
+    timeout = _effective_timeout(operation)
+
+    breakers: Dict[str, CircuitBreaker] = {}
+    for host in hosts:
+        breaker = get_circuit_breaker(host)
+        if not breaker.allow_request(probe_timeout=timeout):
+            for admitted in breakers.values():
+                admitted.release_probe()
+            raise CircuitOpenError(
+                f"Registry '{host}' is unavailable: too many recent connection "
+                "failures, try again later."
+            )
+        breakers[host] = breaker
+
+    try:
+        result = subprocess.run(
+            command, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        # Only count the timeout against the registry when it hit the
+        # configured limit, not a client's tighter deadline.
+        registry_too_slow = timeout >= config.OPERATION_TIMEOUTS[operation]
+        for breaker in breakers.values():
+            if registry_too_slow:
+                breaker.record_failure()
+            else:
+                breaker.release_probe()
+        raise DeadlineExceededError(
+            f"Registry {operation} timed out after {timeout:.1f}s."
+        )
+    except BaseException:
+        # The command never reached the registry (missing binary, fork
+        # failure, interruption): give back any half-open probe slot so the
+        # host is not left failing fast forever.
+        for breaker in breakers.values():
+            breaker.release_probe()
+        raise
+
+    if result.returncode != 0 and is_connection_error(result.stderr):
+        failed = _failed_hosts(hosts, result.stderr)
+        for host, breaker in breakers.items():
+            if host in failed:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+    else:
+        for breaker in breakers.values():
+            breaker.record_success()
+
+    if check and result.returncode != 0:
+        raise subprocess.CalledProcessError(
+            result.returncode, command, output=result.stdout, stderr=result.stderr
+        )
+    return result
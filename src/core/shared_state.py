@@ -0,0 +1,518 @@
+"""
+State shared by every worker process through a SQLite database in WAL mode:
+cached artefact lookups, helm login markers, circuit breakers and in-flight
+jobs.
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.core import config
+from src.core.urls import strip_scheme
+
+logger = logging.getLogger(__name__)
+
+# Environment variable holding the key used to digest registry credentials.
+# The server sets it before spawning workers so they all derive the same keys.
+STATE_KEY_ENV = "ARTEFACT_MANAGER_STATE_KEY"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    operation TEXT NOT NULL,
+    description TEXT NOT NULL,
+    status TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE TABLE IF NOT EXISTS breakers (
+    host TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    failures INTEGER NOT NULL,
+    opened_at REAL NOT NULL,
+    probe_id TEXT,
+    probe_until REAL NOT NULL
+);
+"""
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+_local = threading.local()
+
+# Jobs running in this process, used to drain them on shutdown.
+_running_jobs = 0
+_running_jobs_changed = threading.Condition()
+
+
+def _connection() -> sqlite3.Connection:
+    """
+    Return this thread's connection to the shared database, opening it on
+    first use. Connections are never shared across threads or processes.
+    """
+    conn = getattr(_local, "connection", None)
+    if conn is None or _local.pid != os.getpid():
+        conn = sqlite3.connect(config.STATE_DB_PATH, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _local.connection = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def _state_key() -> bytes:
+    key = os.environ.get(STATE_KEY_ENV)
+    if not key:
+        key = secrets.token_hex(32)
+        os.environ[STATE_KEY_ENV] = key
+    return key.encode()
+
+
+def initialise() -> None:
+    """
+    Prepare the shared state before workers start: fix the credentials key,
+    create the schema, drop expired entries and mark jobs left running by a
+    previous server as interrupted.
+    """
+    _state_key()
+    conn = _connection()
+    now = time.time()
+    conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+    conn.execute(
+        "UPDATE jobs SET status = 'interrupted', finished_at = ? "
+        "WHERE status = 'running'",
+        (now,),
+    )
+
+
+def credentials_digest(username: Optional[str], password: Optional[str]) -> str:
+    """
+    Digest registry credentials so cache entries are scoped to them without
+    storing the credentials themselves.
+
+    :param username: Registry username, if any
+    :param password: Registry password, if any
+    :return: A keyed digest, or "anonymous" when no credentials are given.
+    """
+    if not (username and password):
+        return "anonymous"
+    message = f"{username}:{password}".encode()
+    return hmac.new(_state_key(), message, hashlib.sha256).hexdigest()
+
+
+def cache_get(namespace: str, key: str) -> Optional[Any]:
+    """
+    Look up a shared cache entry.
+
+    :return: The cached value, or None on a miss or an expired entry.
+    """
+    try:
+        row = (
+            _connection()
+            .execute(
+                "SELECT value FROM cache "
+                "WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time()),
+            )
+            .fetchone()
+        )
+    except sqlite3.Error as e:
+        logger.warning("Shared cache lookup failed: %s", e)
+        return None
+    return None if row is None else json.loads(row[0])
+
+
+def cache_set(namespace: str, key: str, value: Any, ttl: float) -> None:
+    """
+    Store a JSON-serialisable value in the shared cache for ``ttl`` seconds.
+    A non-positive ``ttl`` leaves the cache untouched.
+    """
+    if ttl <= 0:
+        return
+    try:
+        _connection().execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) "
+            "VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), time.time() + ttl),
+        )
+    except sqlite3.Error as e:
+        logger.warning("Shared cache update failed: %s", e)
+
+
+def cache_delete(namespace: str, key: str) -> None:
+    """
+    Drop a single shared cache entry.
+    """
+    try:
+        _connection().execute(
+            "DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+    except sqlite3.Error as e:
+        logger.warning("Shared cache invalidation failed: %s", e)
+
+
+def cache_delete_prefix(namespace: str, prefix: str) -> None:
+    """
+    Drop every entry of ``namespace`` whose key starts with ``prefix``.
+    """
+    try:
+        _connection().execute(
+            "DELETE FROM cache WHERE namespace = ? AND substr(key, 1, ?) = ?",
+            (namespace, len(prefix), prefix),
+        )
+    except sqlite3.Error as e:
+        logger.warning("Shared cache invalidation failed: %s", e)
+
+
+def get_artefact_exists(
+    reference: str, username: Optional[str], password: Optional[str]
+) -> Optional[bool]:
+    """
+    Return the cached result of an existence check for ``reference``
+    (registry/project/name:tag), or None if no worker checked it recently.
+    """
+    key = f"{strip_scheme(reference)}#{credentials_digest(username, password)}"
+    return cache_get("exists", key)
+
+
+def set_artefact_exists(
+    reference: str, username: Optional[str], password: Optional[str], exists: bool
+) -> None:
+    key = f"{strip_scheme(reference)}#{credentials_digest(username, password)}"
+    cache_set("exists", key, exists, config.EXISTS_CACHE_TTL)
+
+
+def invalidate_artefact(reference: str) -> None:
+    """
+    Forget cached existence results for ``reference`` under any credentials,
+    after it has been copied, pushed or deleted.
+    """
+    cache_delete_prefix("exists", f"{strip_scheme(reference)}#")
+
+
+@contextlib.contextmanager
+def login_lock() -> Iterator[None]:
+    """
+    Serialise helm logins across threads and workers. Helm keeps the logins
+    of every host in one registry config file, so logins to different hosts
+    must not interleave either, and each marker must match what helm stored.
+    """
+    with open(f"{config.STATE_DB_PATH}.login.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def is_logged_in(registry_host: str, username: str, password: str) -> bool:
+    """
+    Check whether helm was recently logged in to ``registry_host`` with these
+    credentials. Helm keeps a single login per host, so a later login with
+    other credentials replaces the marker.
+    """
+    return cache_get("login", registry_host) == credentials_digest(username, password)
+
+
+def mark_logged_in(registry_host: str, username: str, password: str) -> None:
+    digest = credentials_digest(username, password)
+    cache_set("login", registry_host, digest, config.LOGIN_CACHE_TTL)
+
+
+def forget_login(registry_host: str) -> None:
+    """
+    Drop the login marker of ``registry_host`` so the next request logs in
+    again, e.g. after the registry rejected helm's stored credentials.
+    """
+    cache_delete("login", registry_host)
+
+
+@contextlib.contextmanager
+def _immediate_transaction() -> Iterator[sqlite3.Connection]:
+    """
+    Run statements in a write transaction taken up front, so a
+    read-modify-write cannot interleave with another worker's.
+    """
+    conn = _connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def breaker_state(registry_host: str) -> str:
+    """
+    Return the circuit state of ``registry_host`` as seen by every worker.
+    """
+    try:
+        row = (
+            _connection()
+            .execute("SELECT state FROM breakers WHERE host = ?", (registry_host,))
+            .fetchone()
+        )
+    except sqlite3.Error as e:
+        logger.warning("Reading circuit breaker failed: %s", e)
+        return BREAKER_CLOSED
+    return BREAKER_CLOSED if row is None else row[0]
+
+
+def breaker_allow_request(
+    registry_host: str, reset_timeout: float, probe_timeout: float, probe_id: str
+) -> bool:
+    """
+    Check whether a call to ``registry_host`` may go through. Once an open
+    circuit's ``reset_timeout`` has passed, exactly one caller across all
+    workers claims the half-open probe, under ``probe_id``; the claim lapses
+    after ``probe_timeout`` seconds in case its worker dies.
+
+    :return: True if the call may proceed, False to fail fast. Also True if
+             the shared database is unavailable.
+    """
+    try:
+        if breaker_state(registry_host) == BREAKER_CLOSED:
+            return True
+        with _immediate_transaction() as conn:
+            row = conn.execute(
+                "SELECT state, opened_at, probe_until FROM breakers WHERE host = ?",
+                (registry_host,),
+            ).fetchone()
+            if row is None or row[0] == BREAKER_CLOSED:
+                return True
+            state, opened_at, probe_until = row
+            now = time.time()
+            if state == BREAKER_OPEN and now - opened_at < reset_timeout:
+                return False
+            if state == BREAKER_HALF_OPEN and probe_until > now:
+                return False
+            conn.execute(
+                "UPDATE breakers SET state = ?, probe_id = ?, probe_until = ? "
+                "WHERE host = ?",
+                (BREAKER_HALF_OPEN, probe_id, now + probe_timeout, registry_host),
+            )
+            return True
+    except sqlite3.Error as e:
+        logger.warning("Checking circuit breaker failed: %s", e)
+        return True
+
+
+def breaker_release_probe(registry_host: str, probe_id: str) -> None:
+    """
+    Give back the half-open probe claimed under ``probe_id`` by a call that
+    never ran. Claims held by other callers are left alone.
+    """
+    try:
+        _connection().execute(
+            "UPDATE breakers SET probe_id = NULL, probe_until = 0 "
+            "WHERE host = ? AND probe_id = ?",
+            (registry_host, probe_id),
+        )
+    except sqlite3.Error as e:
+        logger.warning("Releasing circuit breaker probe failed: %s", e)
+
+
+def breaker_record_success(registry_host: str) -> None:
+    """
+    Close the circuit of ``registry_host`` and reset its failure count.
+    """
+    try:
+        conn = _connection()
+        # Only take the write lock when the host has a failure on record.
+        if conn.execute(
+            "SELECT 1 FROM breakers WHERE host = ?", (registry_host,)
+        ).fetchone():
+            conn.execute("DELETE FROM breakers WHERE host = ?", (registry_host,))
+    except sqlite3.Error as e:
+        logger.warning("Recording circuit breaker success failed: %s", e)
+
+
+def breaker_record_failure(registry_host: str, failure_threshold: int) -> None:
+    """
+    Count a connection failure against ``registry_host``, opening its circuit
+    at ``failure_threshold`` consecutive failures or if the probe failed.
+    """
+    try:
+        with _immediate_transaction() as conn:
+            row = conn.execute(
+                "SELECT state, failures, opened_at FROM breakers WHERE host = ?",
+                (registry_host,),
+            ).fetchone()
+            state, failures, opened_at = row or (BREAKER_CLOSED, 0, 0.0)
+            failures += 1
+            if state == BREAKER_HALF_OPEN or failures >= failure_threshold:
+                state, opened_at = BREAKER_OPEN, time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO breakers "
+                "(host, state, failures, opened_at, probe_id, probe_until) "
+                "VALUES (?, ?, ?, ?, NULL, 0)",
+                (registry_host, state, failures, opened_at),
+            )
+    except sqlite3.Error as e:
+        logger.warning("Recording circuit breaker failure failed: %s", e)
+
+
+@contextlib.contextmanager
+def track_job(operation: str, description: str) -> Iterator[str]:
+    """
+    Record a registry operation in the shared job table while it runs, and
+    count it as in flight in this process so shutdown can wait for it.
+
+    :param operation: Kind of operation (e.g., copy)
+    :param description: Human readable summary, without credentials
+    :return: The job id.
+    """
+    global _running_jobs
+
+    job_id = uuid.uuid4().hex
+    with _running_jobs_changed:
+        _running_jobs += 1
+    try:
+        try:
+            _connection().execute(
+                "INSERT INTO jobs "
+                "(id, operation, description, status, pid, started_at) "
+                "VALUES (?, ?, ?, 'running', ?, ?)",
+                (job_id, operation, description, os.getpid(), time.time()),
+            )
+        except sqlite3.Error as e:
+            logger.warning("Recording job %s failed: %s", job_id, e)
+
+        status, detail = "failed", None
+        try:
+            yield job_id
+            status = "succeeded"
+        except Exception as e:
+            detail = str(e)
+            raise
+        finally:
+            # A shared state failure must not hide the operation's own result.
+            now = time.time()
+            try:
+                conn = _connection()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, detail = ? "
+                    "WHERE id = ?",
+                    (status, now, detail, job_id),
+                )
+                conn.execute(
+                    "DELETE FROM jobs WHERE status != 'running' AND finished_at < ?",
+                    (now - config.JOB_RETENTION,),
+                )
+            except sqlite3.Error as e:
+                logger.warning("Updating job %s failed: %s", job_id, e)
+    finally:
+        with _running_jobs_changed:
+            _running_jobs -= 1
+            _running_jobs_changed.notify_all()
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def interrupt_orphaned_jobs() -> None:
+    """
+    Mark as interrupted the running jobs of workers that no longer exist,
+    e.g. a worker killed for running out of memory and replaced by uvicorn.
+    """
+    try:
+        conn = _connection()
+        pids = [
+            row[0]
+            for row in conn.execute(
+                "SELECT DISTINCT pid FROM jobs WHERE status = 'running'"
+            )
+        ]
+        now = time.time()
+        for pid in pids:
+            if not _process_alive(pid):
+                conn.execute(
+                    "UPDATE jobs SET status = 'interrupted', finished_at = ?, "
+                    "detail = 'worker process exited' "
+                    "WHERE status = 'running' AND pid = ?",
+                    (now, pid),
+                )
+    except sqlite3.Error as e:
+        logger.warning("Marking orphaned jobs as interrupted failed: %s", e)
+
+
+def list_jobs(status: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    List jobs from every worker, most recent first. Jobs left running by
+    workers that died are reported as interrupted.
+
+    :param status: Only return jobs in this status, or all jobs if None.
+    :raises RuntimeError: If the shared database cannot be read.
+    """
+    query = (
+        "SELECT id, operation, description, status, pid, started_at, "
+        "finished_at, detail FROM jobs"
+    )
+    params: tuple = ()
+    if status is not None:
+        query += " WHERE status = ?"
+        params = (status,)
+    query += " ORDER BY started_at DESC"
+    interrupt_orphaned_jobs()
+    try:
+        cursor = _connection().execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.warning("Listing jobs failed: %s", e)
+        raise RuntimeError(f"Job status is temporarily unavailable: {e}")
+
+
+def wait_for_jobs(timeout: float) -> bool:
+    """
+    Block until this process has no job in flight, or ``timeout`` passes.
+
+    :return: True if every job finished in time.
+    """
+    with _running_jobs_changed:
+        return _running_jobs_changed.wait_for(lambda: _running_jobs == 0, timeout)
+
+
+def interrupt_jobs() -> None:
+    """
+    Mark the jobs still running in this process as interrupted.
+    """
+    try:
+        _connection().execute(
+            "UPDATE jobs SET status = 'interrupted', finished_at = ? "
+            "WHERE status = 'running' AND pid = ?",
+            (time.time(), os.getpid()),
+        )
+    except sqlite3.Error as e:
+        logger.warning("Marking jobs as interrupted failed: %s", e)
@@ -0,0 +1,34 @@
+"""
+Helpers for the registry URLs accepted by the API.
+"""
+
+REGISTRY_SCHEMES = ("oci://", "docker://", "https://", "http://")
+
+
+def strip_scheme(registry_url: str) -> str:
+    """
+    Remove the scheme, if any, from a registry URL or artefact reference.
+
+    Args:
+        registry_url: e.g. oci://registry.example.com/project
+
+    Returns:
+        The URL without its scheme, e.g. registry.example.com/project
+    """
+    for scheme in REGISTRY_SCHEMES:
+        if registry_url.startswith(scheme):
+            return registry_url[len(scheme) :]
+    return registry_url
+
+
+def extract_registry_host(registry_url: str) -> str:
+    """
+    Extract registry host from a registry URL with or without a scheme.
+
+    Args:
+        registry_url: The full registry URL
+
+    Returns:
+        The registry hostname, lower-cased
+    """
+    return strip_scheme(registry_url).split("/")[0].lower()
@@ -1,12 +1,18 @@
 """
 Helm helper functions for registry operations.
 """
-import subprocess
+
+import re
+from typing import Optional
+
+from src.core import shared_state
+from src.core.resilience import run_registry_command
 
 
 def helm_registry_login(registry_host: str, username: str, password: str) -> None:
     """
-    Perform Helm registry login.
+    Perform Helm registry login. Logins are shared by every worker through
+    the helm registry config, so a recent successful login is not repeated.
 
     Args:
         registry_host: The registry hostname
@@ -15,33 +21,30 @@ def helm_registry_login(registry_host: str, username: str, password: str) -> Non
 
     Raises:
         RuntimeError: If login fails
+        DeadlineExceededError: If the registry does not answer in time
+        CircuitOpenError: If the registry is failing fast
     """
-    login_cmd = [
-        "helm",
-        "registry",
-        "login",
-        registry_host,
-        "-u",
-        username,
-        "-p",
-        password,
-    ]
-    login_result = subprocess.run(login_cmd, capture_output=True, text=True)
-    if login_result.returncode != 0:
-        raise RuntimeError(f"Helm registry login failed: {login_result.stderr.strip()}")
-
-
-def extract_registry_host(registry_url: str) -> str:
-    """
-    Extract registry host from OCI URL.
+    # Helm keeps every login in one config file; serialise logins and markers.
+    with shared_state.login_lock():
+        if shared_state.is_logged_in(registry_host, username, password):
+            return
 
-    Args:
-        registry_url: The full OCI registry URL
-
-    Returns:
-        The registry hostname
-    """
-    return registry_url.replace("oci://", "").split("/")[0]
+        login_cmd = [
+            "helm",
+            "registry",
+            "login",
+            registry_host,
+            "-u",
+            username,
+            "-p",
+            password,
+        ]
+        login_result = run_registry_command(login_cmd, "login", [registry_host])
+        if login_result.returncode != 0:
+            raise RuntimeError(
+                f"Helm registry login failed: {login_result.stderr.strip()}"
+            )
+        shared_state.mark_logged_in(registry_host, username, password)
 
 
 def build_chart_reference(
@@ -66,3 +69,18 @@ def build_chart_reference(
         # chart_name doesn't include project, so add the full registry path
         chart_ref = f"{registry_base}/{chart_name}:{chart_version}"
     return chart_ref
+
+
+def pushed_chart_reference(push_output: str) -> Optional[str]:
+    """
+    Extract the chart reference from the output of ``helm push``.
+
+    Args:
+        push_output: Combined stdout and stderr of ``helm push``
+
+    Returns:
+        The pushed reference (e.g. registry.example.com/project/chart:1.0.0),
+        or None if helm did not report one
+    """
+    match = re.search(r"^Pushed:\s*(\S+)", push_output, re.MULTILINE)
+    return match.group(1) if match else None
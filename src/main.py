@@ -1,10 +1,44 @@
+import argparse
+
 import uvicorn
 
-if __name__ == "__main__":
+from src.core import config, shared_state
+
+
+def serve_production() -> None:
+    """
+    Serve the API with several worker processes sharing state through
+    src.core.shared_state. Stopping the server drains in-flight operations.
+    """
+    shared_state.initialise()
     uvicorn.run(
         "src.api.api:app",
-        host="0.0.0.0",
-        port=8000,
+        host=config.HOST,
+        port=config.PORT,
+        workers=config.WORKERS,
+        backlog=config.BACKLOG,
+        timeout_keep_alive=config.KEEP_ALIVE_TIMEOUT,
+        timeout_graceful_shutdown=config.GRACEFUL_SHUTDOWN_TIMEOUT,
         log_level="info",
-        reload=True,
     )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Artefact Manager API.")
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="Run multiple workers without hot-reloading.",
+    )
+    args = parser.parse_args()
+
+    if args.production:
+        serve_production()
+    else:
+        uvicorn.run(
+            "src.api.api:app",
+            host="0.0.0.0",
+            port=8000,
+            log_level="info",
+            reload=True,
+        )
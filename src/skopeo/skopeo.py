@@ -2,6 +2,9 @@ import json
 import subprocess
 from typing import Optional
 
+from src.core import shared_state
+from src.core.resilience import is_connection_error, run_registry_command
+
 
 class SkopeoClient:
     """
@@ -30,12 +33,21 @@ class SkopeoClient:
         :return: True if the artefact exists, False if it does not.
         :raises RuntimeError: If authentication fails, repository does not
                               exist, or connectivity issues occur.
+        :raises DeadlineExceededError: If the registry does not answer in time.
+        :raises CircuitOpenError: If the registry is failing fast.
         """
         full_repo_url = f"{registry_url.rstrip('/')}/{artefact_name}"
+        reference = f"{full_repo_url}:{artefact_tag}"
+        cached = shared_state.get_artefact_exists(
+            reference, registry_username, registry_password
+        )
+        if cached is not None:
+            return cached
+
         skopeo_command = [
             "skopeo",
             "inspect",
-            f"docker://{full_repo_url}:{artefact_tag}",
+            f"docker://{reference}",
         ]
         if registry_username and registry_password:
             skopeo_command.extend(
@@ -43,7 +55,10 @@ class SkopeoClient:
             )
 
         try:
-            subprocess.run(skopeo_command, check=True, capture_output=True, text=True)
+            run_registry_command(skopeo_command, "inspect", [registry_url], check=True)
+            shared_state.set_artefact_exists(
+                reference, registry_username, registry_password, True
+            )
             return True  # If the command succeeds, the artefact exists
 
         except subprocess.CalledProcessError as e:
@@ -81,6 +96,14 @@ class SkopeoClient:
                     (f"DNS resolution failed: Unable to resolve " f"'{registry_url}'.")
                 )
 
+            # Only a registry that answered "manifest unknown" is a definite
+            # "does not exist"; outages and other errors must not be shared.
+            if "manifest unknown" in error_message and not is_connection_error(
+                error_message
+            ):
+                shared_state.set_artefact_exists(
+                    reference, registry_username, registry_password, False
+                )
             return False
 
         except json.JSONDecodeError:
@@ -130,7 +153,15 @@ class SkopeoClient:
             )
 
         try:
-            subprocess.run(skopeo_command, check=True, capture_output=True, text=True)
+            run_registry_command(
+                skopeo_command,
+                "copy",
+                [src_registry_url, dst_registry_url],
+                check=True,
+            )
+            shared_state.invalidate_artefact(
+                f"{dst_registry_url.rstrip('/')}/{dst_artefact_name}:{dst_artefact_tag}"
+            )
             return True  # If the command succeeds, the artefact was copied
 
         except subprocess.CalledProcessError as e:
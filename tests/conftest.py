@@ -0,0 +1,34 @@
+import os
+import threading
+
+import pytest
+
+from src.core import config, resilience, shared_state
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """
+    Give every test its own shared state database and circuit breakers.
+    """
+    monkeypatch.setattr(config, "STATE_DB_PATH", str(tmp_path / "state.db"))
+    monkeypatch.setattr(shared_state, "_local", threading.local())
+    monkeypatch.setattr(resilience, "_breakers", {})
+
+
+@pytest.fixture
+def fake_cli(tmp_path, monkeypatch):
+    """
+    Put a directory first on PATH and return a function that installs a shell
+    script there under a CLI name such as skopeo or helm.
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    def install(name: str, script: str) -> None:
+        path = bin_dir / name
+        path.write_text(f"#!/bin/sh\n{script}\n")
+        path.chmod(0o755)
+
+    return install
@@ -0,0 +1,119 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.api import app
+from src.core import config, shared_state
+
+EXISTS_REQUEST = {
+    "registry_url": "reg.example/project",
+    "artefact_name": "nginx",
+    "artefact_tag": "latest",
+}
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header", ["abc", "0", "-5", "nan", "inf", "1e400"])
+def test_invalid_deadline_header_is_rejected(client, header):
+    response = client.post(
+        "/artefact-exists", json=EXISTS_REQUEST, headers={"X-Request-Timeout": header}
+    )
+    assert response.status_code == 400
+
+
+def test_exceeded_deadline_returns_504(client, fake_cli):
+    fake_cli("skopeo", "exec sleep 5")
+    response = client.post(
+        "/artefact-exists", json=EXISTS_REQUEST, headers={"X-Request-Timeout": "0.2"}
+    )
+    assert response.status_code == 504
+
+
+def test_open_circuit_returns_503(client, fake_cli, monkeypatch):
+    monkeypatch.setattr(config, "CIRCUIT_BREAKER_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(config, "EXISTS_CACHE_TTL", 0)
+    fake_cli("skopeo", "echo 'dial tcp: connection refused' >&2; exit 1")
+    client.post("/artefact-exists", json=EXISTS_REQUEST)
+
+    response = client.post("/artefact-exists", json=EXISTS_REQUEST)
+    assert response.status_code == 503
+
+
+def test_artefact_exists_with_deadline(client, fake_cli):
+    fake_cli("skopeo", "exit 0")
+    response = client.post(
+        "/artefact-exists", json=EXISTS_REQUEST, headers={"X-Request-Timeout": "10"}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"exists": True}
+
+
+def test_upload_invalidates_pushed_chart(client, fake_cli):
+    fake_cli("helm", "echo 'Pushed: reg.example/project/mychart:0.1.0' >&2")
+    shared_state.set_artefact_exists(
+        "reg.example/project/mychart:0.1.0", None, None, False
+    )
+
+    response = client.post(
+        "/artefact",
+        files={"artefact_file": ("mychart-0.1.0.tgz", b"chart", "application/gzip")},
+        data={"artefact_type": "HELM", "registry_url": "oci://reg.example/project"},
+    )
+    assert response.status_code == 200
+    assert (
+        shared_state.get_artefact_exists(
+            "reg.example/project/mychart:0.1.0", None, None
+        )
+        is None
+    )
+    [job] = client.get("/jobs", params={"status": "succeeded"}).json()["jobs"]
+    assert job["operation"] == "push"
+
+
+def test_list_jobs_defaults_to_all_jobs(client):
+    with shared_state.track_job("copy", "a -> b"):
+        pass
+    with pytest.raises(RuntimeError):
+        with shared_state.track_job("delete", "c"):
+            raise RuntimeError("boom")
+
+    response = client.get("/jobs")
+    assert response.status_code == 200
+    assert {job["status"] for job in response.json()["jobs"]} == {"succeeded", "failed"}
+    assert client.get("/jobs", params={"status": "running"}).json() == {"jobs": []}
+
+
+def test_list_jobs_returns_503_when_state_is_unavailable(client, monkeypatch):
+    def broken_connection():
+        raise shared_state.sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(shared_state, "_connection", broken_connection)
+    response = client.get("/jobs")
+    assert response.status_code == 503
+    assert "database is locked" in response.json()["detail"]
+
+
+def test_unauthorized_push_forces_a_new_login(client, fake_cli, tmp_path):
+    logins = tmp_path / "logins"
+    fake_cli(
+        "helm",
+        f'if [ "$1" = registry ]; then echo login >> {logins}; exit 0; fi\n'
+        "echo 'unexpected status: 401 Unauthorized' >&2\nexit 1",
+    )
+    upload = {
+        "files": {"artefact_file": ("mychart-0.1.0.tgz", b"chart", "application/gzip")},
+        "data": {
+            "artefact_type": "HELM",
+            "registry_url": "oci://reg.example/project",
+            "registry_username": "alice",
+            "registry_password": "secret",
+        },
+    }
+
+    assert client.post("/artefact", **upload).status_code == 500
+    assert not shared_state.is_logged_in("reg.example", "alice", "secret")
+    client.post("/artefact", **upload)
+    assert logins.read_text().split() == ["login", "login"]
@@ -0,0 +1,89 @@
+import threading
+
+from src.core import shared_state
+from src.helm.helm import helm_registry_login, pushed_chart_reference
+
+
+def install_helm(fake_cli, tmp_path):
+    """
+    Install a fake helm that records the username of every login, in order,
+    then takes a varying time to exit like a real registry round-trip.
+    """
+    logins = tmp_path / "logins"
+    logins.touch()
+    fake_cli("helm", f"echo $5 >> {logins}\nsleep 0.0$(($$ % 10))")
+    return lambda: logins.read_text().split()
+
+
+def test_repeated_login_is_skipped(fake_cli, tmp_path):
+    logins = install_helm(fake_cli, tmp_path)
+    helm_registry_login("reg.example", "alice", "secret")
+    helm_registry_login("reg.example", "alice", "secret")
+    assert logins() == ["alice"]
+
+    helm_registry_login("reg.example", "bob", "hunter2")
+    helm_registry_login("reg.example", "alice", "secret")
+    assert logins() == ["alice", "bob", "alice"]
+
+
+def test_concurrent_logins_keep_marker_in_sync(fake_cli, tmp_path):
+    logins = install_helm(fake_cli, tmp_path)
+    credentials = {"alice": "secret", "bob": "hunter2"}
+
+    threads = [
+        threading.Thread(
+            target=helm_registry_login,
+            args=("reg.example", user, credentials[user]),
+        )
+        for user in ["alice", "bob"] * 5
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    last_user = logins()[-1]
+    assert shared_state.is_logged_in("reg.example", last_user, credentials[last_user])
+
+
+def test_pushed_chart_reference():
+    output = "Pushed: reg.example/project/mychart:0.1.0\nDigest: sha256:abc\n"
+    assert pushed_chart_reference(output) == "reg.example/project/mychart:0.1.0"
+    assert pushed_chart_reference("Error: failed") is None
+
+
+def test_logins_to_different_hosts_do_not_overlap(fake_cli, tmp_path):
+    busy, overlaps = tmp_path / "busy", tmp_path / "overlaps"
+    overlaps.touch()
+    fake_cli(
+        "helm",
+        f"[ -e {busy} ] && echo $3 >> {overlaps}\n"
+        f"touch {busy}\nsleep 0.02\nrm -f {busy}",
+    )
+
+    threads = [
+        threading.Thread(
+            target=helm_registry_login, args=(f"reg{i}.example", "alice", "secret")
+        )
+        for i in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert overlaps.read_text() == ""
+    assert all(
+        shared_state.is_logged_in(f"reg{i}.example", "alice", "secret")
+        for i in range(6)
+    )
+
+
+def test_forget_login_only_drops_that_host():
+    shared_state.mark_logged_in("reg.example", "alice", "secret")
+    shared_state.mark_logged_in("reg.example:5000", "alice", "secret")
+
+    shared_state.forget_login("reg.example")
+
+    assert not shared_state.is_logged_in("reg.example", "alice", "secret")
+    assert shared_state.is_logged_in("reg.example:5000", "alice", "secret")
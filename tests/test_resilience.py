@@ -0,0 +1,227 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.core import config, shared_state
+from src.core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceededError,
+    get_circuit_breaker,
+    reset_request_deadline,
+    run_registry_command,
+    set_request_deadline,
+)
+
+CONNECTION_REFUSED = ["sh", "-c", "echo 'dial tcp: connection refused' >&2; exit 1"]
+
+
+@pytest.fixture
+def request_deadline():
+    tokens = []
+
+    def set_deadline(timeout):
+        tokens.append(set_request_deadline(timeout))
+
+    yield set_deadline
+    for token in reversed(tokens):
+        reset_request_deadline(token)
+
+
+def test_breaker_opens_at_threshold():
+    breaker = CircuitBreaker("reg.example", failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_breaker_success_resets_failure_count():
+    breaker = CircuitBreaker("reg.example", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_allows_single_probe_after_reset_timeout(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(shared_state.time, "time", lambda: now[0])
+    breaker = CircuitBreaker("reg.example", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    now[0] += 29
+    assert not breaker.allow_request()
+
+    now[0] += 1
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+
+
+def test_breaker_probe_outcome_closes_or_reopens():
+    breaker = CircuitBreaker("reg.example", failure_threshold=5, reset_timeout=0)
+    for _ in range(5):
+        breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_breaker_released_probe_can_be_claimed_again():
+    breaker = CircuitBreaker("reg.example", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.release_probe()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_breaker_state_is_shared_between_workers():
+    breaker = CircuitBreaker("reg.example", failure_threshold=2, reset_timeout=0)
+    other = CircuitBreaker("reg.example", failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    other.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Another worker process sees the open circuit and claims the only probe.
+    probe = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from src.core.resilience import CircuitBreaker\n"
+            "breaker = CircuitBreaker('reg.example', 2, 0)\n"
+            "print(breaker.allow_request(), breaker.allow_request())",
+        ],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "ARTEFACT_MANAGER_STATE_DB": config.STATE_DB_PATH},
+        check=True,
+    )
+    assert probe.stdout.split() == ["True", "False"]
+    assert not breaker.allow_request()
+    assert not other.allow_request()
+
+
+def test_breaker_release_leaves_other_probes_alone():
+    breaker = CircuitBreaker("reg.example", failure_threshold=1, reset_timeout=0)
+    other = CircuitBreaker("reg.example", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert other.allow_request()
+
+    # Nothing was claimed through this handle, so the other probe stays held.
+    breaker.release_probe()
+    assert not breaker.allow_request()
+
+
+def test_unreleased_probe_claim_lapses(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(shared_state.time, "time", lambda: now[0])
+    breaker = CircuitBreaker("reg.example", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow_request(probe_timeout=10)
+
+    now[0] += 9
+    assert not breaker.allow_request()
+    now[0] += 1
+    assert breaker.allow_request()
+
+
+def test_connection_errors_open_the_circuit(monkeypatch):
+    monkeypatch.setattr(config, "CIRCUIT_BREAKER_FAILURE_THRESHOLD", 2)
+    for _ in range(2):
+        result = run_registry_command(CONNECTION_REFUSED, "inspect", ["reg.example"])
+        assert result.returncode == 1
+
+    with pytest.raises(CircuitOpenError):
+        run_registry_command(["true"], "inspect", ["https://reg.example/project"])
+
+
+def test_registry_errors_do_not_count_as_connection_failures(monkeypatch):
+    monkeypatch.setattr(config, "CIRCUIT_BREAKER_FAILURE_THRESHOLD", 1)
+    unauthorized = ["sh", "-c", "echo 'unauthorized' >&2; exit 1"]
+    run_registry_command(unauthorized, "inspect", ["reg.example"])
+    assert get_circuit_breaker("reg.example").state == CircuitBreaker.CLOSED
+
+
+def test_check_raises_called_process_error():
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        run_registry_command(CONNECTION_REFUSED, "inspect", ["reg.example"], check=True)
+    assert "connection refused" in excinfo.value.stderr
+
+
+def test_failed_start_releases_half_open_probe(monkeypatch):
+    monkeypatch.setattr(config, "CIRCUIT_BREAKER_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(config, "CIRCUIT_BREAKER_RESET_TIMEOUT", 0)
+    run_registry_command(CONNECTION_REFUSED, "inspect", ["reg.example"])
+
+    with pytest.raises(FileNotFoundError):
+        run_registry_command(["/nonexistent/skopeo"], "inspect", ["reg.example"])
+
+    breaker = get_circuit_breaker("reg.example")
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_rejection_releases_probes_of_other_hosts(monkeypatch):
+    monkeypatch.setattr(config, "CIRCUIT_BREAKER_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(config, "CIRCUIT_BREAKER_RESET_TIMEOUT", 0)
+    src = get_circuit_breaker("src.example")
+    src.record_failure()
+    dst = get_circuit_breaker("dst.example")
+    dst.record_failure()
+    assert dst.allow_request()
+
+    with pytest.raises(CircuitOpenError):
+        run_registry_command(["true"], "copy", ["src.example", "dst.example"])
+    assert src.allow_request()
+
+
+def test_configured_timeout_counts_against_registry(monkeypatch):
+    monkeypatch.setattr(config, "OPERATION_TIMEOUTS", {"inspect": 0.2})
+    monkeypatch.setattr(config, "CIRCUIT_BREAKER_FAILURE_THRESHOLD", 1)
+
+    with pytest.raises(DeadlineExceededError):
+        run_registry_command(["sleep", "5"], "inspect", ["reg.example"])
+    assert get_circuit_breaker("reg.example").state == CircuitBreaker.OPEN
+
+
+def test_client_deadline_clamps_timeout_without_tripping_breaker(
+    monkeypatch, request_deadline
+):
+    monkeypatch.setattr(config, "OPERATION_TIMEOUTS", {"inspect": 30.0})
+    monkeypatch.setattr(config, "CIRCUIT_BREAKER_FAILURE_THRESHOLD", 1)
+    request_deadline(0.2)
+
+    with pytest.raises(DeadlineExceededError, match="after 0.2s"):
+        run_registry_command(["sleep", "5"], "inspect", ["reg.example"])
+    assert get_circuit_breaker("reg.example").state == CircuitBreaker.CLOSED
+
+
+def test_client_deadline_never_extends_configured_timeout(
+    monkeypatch, request_deadline
+):
+    monkeypatch.setattr(config, "OPERATION_TIMEOUTS", {"inspect": 0.2})
+    request_deadline(60)
+
+    with pytest.raises(DeadlineExceededError, match="after 0.2s"):
+        run_registry_command(["sleep", "5"], "inspect", ["reg.example"])
+
+
+def test_expired_deadline_fails_before_running(request_deadline):
+    request_deadline(-1)
+    with pytest.raises(DeadlineExceededError, match="before inspect could start"):
+        run_registry_command(["true"], "inspect", ["reg.example"])
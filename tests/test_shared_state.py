@@ -0,0 +1,176 @@
+import subprocess
+import threading
+
+import pytest
+
+from src.core import config, shared_state
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(shared_state.time, "time", lambda: now[0])
+    return now
+
+
+def test_cache_entries_expire_after_ttl(clock):
+    shared_state.cache_set("ns", "key", {"a": 1}, ttl=30)
+    assert shared_state.cache_get("ns", "key") == {"a": 1}
+
+    clock[0] += 30
+    assert shared_state.cache_get("ns", "key") is None
+
+
+def test_non_positive_ttl_disables_cache():
+    shared_state.cache_set("ns", "key", True, ttl=0)
+    assert shared_state.cache_get("ns", "key") is None
+
+
+def test_existence_is_scoped_to_credentials():
+    shared_state.set_artefact_exists("reg.example/p/nginx:1", "alice", "secret", True)
+
+    assert shared_state.get_artefact_exists("reg.example/p/nginx:1", "alice", "secret")
+    assert (
+        shared_state.get_artefact_exists("reg.example/p/nginx:1", "alice", "other")
+        is None
+    )
+    assert shared_state.get_artefact_exists("reg.example/p/nginx:1", None, None) is None
+
+
+def test_existence_keys_ignore_url_scheme():
+    shared_state.set_artefact_exists("https://reg.example/p/nginx:1", None, None, False)
+    assert (
+        shared_state.get_artefact_exists("reg.example/p/nginx:1", None, None) is False
+    )
+
+
+def test_invalidate_drops_every_credential_but_only_that_reference():
+    shared_state.set_artefact_exists("reg.example/p/nginx:1", "alice", "secret", True)
+    shared_state.set_artefact_exists("reg.example/p/nginx:1", None, None, False)
+    shared_state.set_artefact_exists("reg.example/p/nginx:10", None, None, True)
+
+    shared_state.invalidate_artefact("oci://reg.example/p/nginx:1")
+
+    assert (
+        shared_state.get_artefact_exists("reg.example/p/nginx:1", "alice", "secret")
+        is None
+    )
+    assert shared_state.get_artefact_exists("reg.example/p/nginx:1", None, None) is None
+    assert shared_state.get_artefact_exists("reg.example/p/nginx:10", None, None)
+
+
+def test_credentials_are_not_stored():
+    digest = shared_state.credentials_digest("alice", "secret")
+    assert "secret" not in digest
+    assert digest == shared_state.credentials_digest("alice", "secret")
+    assert shared_state.credentials_digest(None, None) == "anonymous"
+
+
+def test_login_marker_follows_latest_credentials():
+    shared_state.mark_logged_in("reg.example", "alice", "secret")
+    assert shared_state.is_logged_in("reg.example", "alice", "secret")
+
+    shared_state.mark_logged_in("reg.example", "bob", "hunter2")
+    assert not shared_state.is_logged_in("reg.example", "alice", "secret")
+    assert shared_state.is_logged_in("reg.example", "bob", "hunter2")
+
+
+def test_track_job_records_outcome():
+    with shared_state.track_job("copy", "a -> b") as job_id:
+        [running] = shared_state.list_jobs(status="running")
+        assert running["id"] == job_id
+        assert running["description"] == "a -> b"
+
+    with pytest.raises(RuntimeError):
+        with shared_state.track_job("delete", "c"):
+            raise RuntimeError("registry said no")
+
+    jobs = {job["operation"]: job for job in shared_state.list_jobs()}
+    assert jobs["copy"]["status"] == "succeeded"
+    assert jobs["delete"]["status"] == "failed"
+    assert jobs["delete"]["detail"] == "registry said no"
+    assert shared_state.list_jobs(status="running") == []
+
+
+def test_track_job_survives_database_errors(monkeypatch):
+    def broken_connection():
+        raise shared_state.sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(shared_state, "_connection", broken_connection)
+    with pytest.raises(ValueError, match="real result"):
+        with shared_state.track_job("copy", "a -> b"):
+            raise ValueError("real result")
+    assert shared_state.wait_for_jobs(0)
+
+
+def test_finished_jobs_are_pruned_after_retention(clock, monkeypatch):
+    monkeypatch.setattr(config, "JOB_RETENTION", 60)
+    with shared_state.track_job("copy", "old"):
+        pass
+    clock[0] += 61
+    with shared_state.track_job("copy", "new"):
+        pass
+    assert [job["description"] for job in shared_state.list_jobs()] == ["new"]
+
+
+def test_wait_for_jobs_waits_for_running_jobs():
+    started, release = threading.Event(), threading.Event()
+
+    def run_job():
+        with shared_state.track_job("copy", "a -> b"):
+            started.set()
+            release.wait()
+
+    worker = threading.Thread(target=run_job)
+    worker.start()
+    started.wait()
+
+    assert not shared_state.wait_for_jobs(0.05)
+    release.set()
+    assert shared_state.wait_for_jobs(5)
+    worker.join()
+
+
+def test_interrupt_jobs_marks_running_jobs():
+    started, release = threading.Event(), threading.Event()
+
+    def run_job():
+        with shared_state.track_job("copy", "a -> b"):
+            started.set()
+            release.wait()
+
+    worker = threading.Thread(target=run_job)
+    worker.start()
+    started.wait()
+    shared_state.interrupt_jobs()
+    assert shared_state.list_jobs(status="interrupted")
+    release.set()
+    worker.join()
+
+
+def test_job_helpers_report_database_errors(monkeypatch):
+    def broken_connection():
+        raise shared_state.sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(shared_state, "_connection", broken_connection)
+    with pytest.raises(RuntimeError, match="temporarily unavailable"):
+        shared_state.list_jobs()
+    shared_state.interrupt_jobs()
+
+
+def test_jobs_of_dead_workers_are_interrupted():
+    dead_worker = subprocess.Popen(["true"])
+    dead_worker.wait()
+    shared_state._connection().execute(
+        "INSERT INTO jobs (id, operation, description, status, pid, started_at) "
+        "VALUES ('orphan', 'copy', 'a -> b', 'running', ?, 0)",
+        (dead_worker.pid,),
+    )
+
+    with shared_state.track_job("copy", "c -> d"):
+        running = shared_state.list_jobs(status="running")
+        assert [job["description"] for job in running] == ["c -> d"]
+
+    [orphan] = shared_state.list_jobs(status="interrupted")
+    assert orphan["id"] == "orphan"
+    assert orphan["detail"] == "worker process exited"
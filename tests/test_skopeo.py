@@ -0,0 +1,79 @@
+import pytest
+
+from src.core import shared_state
+from src.skopeo.skopeo import SkopeoClient
+
+REFERENCE = "reg.example/project/nginx:latest"
+
+
+def artefact_exists():
+    return SkopeoClient.artefact_exists(
+        registry_url="reg.example/project",
+        artefact_name="nginx",
+        artefact_tag="latest",
+    )
+
+
+@pytest.fixture
+def counting_skopeo(fake_cli, tmp_path):
+    """
+    Install a fake skopeo that logs each call, and return a function that
+    sets its output and exit code and reports how often it ran.
+    """
+    calls = tmp_path / "calls"
+    calls.touch()
+
+    def install(stderr: str = "", exit_code: int = 0):
+        fake_cli(
+            "skopeo",
+            f"echo call >> {calls}\necho '{stderr}' >&2\nexit {exit_code}",
+        )
+        return lambda: len(calls.read_text().splitlines())
+
+    return install
+
+
+def test_existing_artefact_is_shared_between_calls(counting_skopeo):
+    call_count = counting_skopeo()
+    assert artefact_exists() is True
+    assert artefact_exists() is True
+    assert call_count() == 1
+
+
+def test_manifest_unknown_is_cached_as_missing(counting_skopeo):
+    call_count = counting_skopeo("manifest unknown: manifest unknown", 1)
+    assert artefact_exists() is False
+    assert shared_state.get_artefact_exists(REFERENCE, None, None) is False
+    assert artefact_exists() is False
+    assert call_count() == 1
+
+
+@pytest.mark.parametrize(
+    "stderr",
+    [
+        "dial tcp 10.0.0.1:443: connect: connection refused",
+        "manifest unknown: read: connection reset by peer",
+        "received unexpected HTTP status: 502 Bad Gateway",
+    ],
+)
+def test_unclear_failures_are_not_cached(counting_skopeo, stderr):
+    call_count = counting_skopeo(stderr, 1)
+    assert artefact_exists() is False
+    assert shared_state.get_artefact_exists(REFERENCE, None, None) is None
+    artefact_exists()
+    assert call_count() == 2
+
+
+def test_copy_invalidates_destination(counting_skopeo):
+    counting_skopeo()
+    shared_state.set_artefact_exists("dst.example/p/nginx:1", None, None, False)
+
+    SkopeoClient.copy_artefact(
+        src_registry_url="src.example/p",
+        src_artefact_name="nginx",
+        src_artefact_tag="1",
+        dst_registry_url="dst.example/p",
+        dst_artefact_name="nginx",
+        dst_artefact_tag="1",
+    )
+    assert shared_state.get_artefact_exists("dst.example/p/nginx:1", None, None) is None